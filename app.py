@@ -1,95 +1,128 @@
-# app.py — Sasta Rapido: Delivery Cost Estimator (Single File)
+# app.py — Sasta Rapido: Delivery Cost Estimator
 import streamlit as st
 import pandas as pd
-import plotty Graph as go
-import math
-import time
+import numpy as np
+import plotly.graph_objects as go
+import csv
+import io
+import os
+from pathlib import Path
+
+# Keep numba's on-disk JIT cache (.nbi/.nbc) in a fixed project directory so a
+# deployment image can ship it pre-warmed and cold starts skip LLVM entirely.
+os.environ.setdefault("NUMBA_CACHE_DIR", str(Path(__file__).with_name(".numba_cache")))
+
+# The numba kernels live in utils/. Imported modules stay in sys.modules across
+# Streamlit reruns, so they compile once per server process without needing
+# st.cache_resource.
+from utils import calculator, geoutils
 
 # ───────────────────────────────
-# 🔧 UTILITY FUNCTIONS (inlined)
+# 🔧 UTILITY FUNCTIONS (from utils/)
 # ───────────────────────────────
 
-def haversine_distance(lat1, lon1, lat2, lon2):
-    """Calculate great circle distance in km."""
-    R = 6371.0
-    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
-
-def calculate_delivery_cost(
-    distance_km,
-    base_fee=20,
-    per_km_rate=10,
-    surge_multiplier=1.0,
-    discount_percent=0,
-    min_total=30
-):
-    distance_cost = distance_km * per_km_rate
-    subtotal = base_fee + distance_cost
-    surcharged = subtotal * surge_multiplier
-    discounted = surcharged * (1 - discount_percent / 100)
-    total = max(discounted, min_total)
-    
-    return {
-        "base_fee": base_fee,
-        "distance_cost": round(distance_cost, 2),
-        "subtotal": round(subtotal, 2),
-        "surge_multiplier": surge_multiplier,
-        "surge_amount": round(surcharged - subtotal, 2),
-        "discount_percent": discount_percent,
-        "discount_amount": round(surcharged - discounted, 2),
-        "final_total": round(total, 2)
-    }
+# Memoized across reruns; signatures, defaults and docs come from utils/.
+fast_distance_km = st.cache_data(max_entries=1024)(geoutils.fast_distance_km)
+calculate_delivery_cost = st.cache_data(max_entries=1024)(calculator.calculate_delivery_cost)
+
+# ───────────────────────────────
+# 🎨 STYLES (read once from style.css)
+# ───────────────────────────────
+
+@st.cache_resource
+def _load_css():
+    """Read style.css once per server process and wrap it in a <style> tag."""
+    css = Path(__file__).with_name("style.css").read_text(encoding="utf-8")
+    return f"<style>\n{css}\n</style>"
+
+# ───────────────────────────────
+# 📈 CHARTS
+# ───────────────────────────────
+
+@st.cache_data(max_entries=256)
+def build_waterfall(base, dist_cost, surge_amt, disc_amt, total):
+    """Cost breakdown waterfall; keyed on the five primitive amounts."""
+    return go.Figure(
+        data=go.Waterfall(
+            orientation="v",
+            measure=["absolute", "relative", "relative", "relative", "total"],
+            x=["Base Fee", "Distance", "Surge", "Discount", "Final Total"],
+            text=[
+                f"₨{base}",
+                f"₨{dist_cost:.2f}",
+                f"+₨{surge_amt:.2f}",
+                f"-₨{disc_amt:.2f}",
+                f"₨{total:.2f}"
+            ],
+            y=[base, dist_cost, surge_amt, -disc_amt, total],
+            connector={"line": {"color": "rgb(63, 63, 63)"}},
+            decreasing={"marker": {"color": "#E53935"}},
+            increasing={"marker": {"color": "#1E88E5"}},
+            totals={"marker": {"color": "#43A047"}}
+        ),
+        layout=dict(
+            title="💰 Cost Breakdown",
+            showlegend=False,
+            height=350,
+            margin=dict(t=40, b=40)
+        )
+    )
+
+# ───────────────────────────────
+# 📥 EXPORT
+# ───────────────────────────────
+
+CSV_HEADERS = [
+    "Distance (km)",
+    "Base Fee (₨)",
+    "Distance Cost (₨)",
+    "Surge Amount (₨)",
+    "Discount (₨)",
+    "Total (₨)",
+    "Surge Multiplier",
+    "Discount (%)"
+]
+
+@st.cache_data(max_entries=256)
+def make_csv_bytes(distance, base_fee, distance_cost, surge_amount, discount_amount, final_total, surge, discount):
+    """Single-row estimate CSV as UTF-8 bytes for the download button."""
+    buf = io.StringIO()
+    w = csv.writer(buf, lineterminator="\n")
+    w.writerow(CSV_HEADERS)
+    w.writerow([
+        distance,
+        base_fee,
+        round(distance_cost, 2),
+        round(surge_amount, 2),
+        round(discount_amount, 2),
+        round(final_total, 2),
+        surge,
+        discount
+    ])
+    return buf.getvalue().encode('utf-8')
 
 # ───────────────────────────────
-# 🎨 EMBEDDED CSS (no external file)
+# 📤 UPLOADS
 # ───────────────────────────────
-CUSTOM_CSS = """
-<style>
-.stApp {
-    background: linear-gradient(135deg, #f5f7fa 0%, #e4edf5 100%);
-}
-.main .block-container {
-    padding-top: 2rem;
-    padding-bottom: 2rem;
-}
-.card {
-    background: white;
-    border-radius: 16px;
-    padding: 1.5rem;
-    box-shadow: 0 4px 12px rgba(0,0,0,0.05);
-    margin-bottom: 1.5rem;
-    transition: transform 0.2s;
-}
-.card:hover {
-    transform: translateY(-3px);
-}
-.metric-card {
-    text-align: center;
-    padding: 1rem;
-    border-radius: 12px;
-    background: #f8f9fa;
-}
-.metric-value {
-    font-size: 1.8rem;
-    font-weight: 700;
-    color: #FF6B35;
-}
-.metric-label {
-    font-size: 0.9rem;
-    color: #6c757d;
-}
-footer {
-    font-size: 0.8rem;
-    text-align: center;
-    margin-top: 2rem;
-    color: #6c757d;
-}
-</style>
-"""
+
+def _read_upload(file):
+    """Parse an uploaded CSV; show st.error and return None if it is unreadable."""
+    try:
+        return pd.read_csv(file)
+    except (pd.errors.EmptyDataError, pd.errors.ParserError, UnicodeDecodeError) as exc:
+        st.error(f"Could not read {file.name}: {exc}")
+        return None
+
+def _coerce_coordinates(df, columns):
+    """Coerce coordinate columns to float; drop rows that are blank, non-numeric or inf.
+
+    Returns the cleaned frame and the number of rows dropped.
+    """
+    df = df.copy()
+    for c in columns:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+    valid = np.isfinite(df[columns]).all(axis=1)
+    return df[valid].reset_index(drop=True), int((~valid).sum())
 
 # ───────────────────────────────
 # 🚀 STREAMLIT APP
@@ -102,7 +135,7 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+st.markdown(_load_css(), unsafe_allow_html=True)
 
 # Header
 col1, col2 = st.columns([0.15, 0.85])
@@ -124,43 +157,52 @@ with st.sidebar:
 st.markdown('<div class="card">', unsafe_allow_html=True)
 st.subheader("📍 Enter Delivery Details")
 
-col1, col2 = st.columns(2)
+with st.form("delivery_form", clear_on_submit=False):
+    col1, col2 = st.columns(2)
 
-with col1:
-    st.write("**Pickup Location**")
-    pickup_lat = st.number_input("Latitude", value=19.0760, format="%.4f", help="e.g., 19.0760 for Mumbai")
-    pickup_lon = st.number_input("Longitude", value=72.8777, format="%.4f", help="e.g., 72.8777 for Mumbai")
+    with col1:
+        st.write("**Pickup Location**")
+        pickup_lat = st.number_input("Latitude", value=19.0760, format="%.4f", help="e.g., 19.0760 for Mumbai")
+        pickup_lon = st.number_input("Longitude", value=72.8777, format="%.4f", help="e.g., 72.8777 for Mumbai")
 
-with col2:
-    st.write("**Drop-off Location**")
-    drop_lat = st.number_input("Drop Latitude", value=19.1136, format="%.4f", help="e.g., 19.1136 (Andheri)")
-    drop_lon = st.number_input("Drop Longitude", value=72.8697, format="%.4f", help="e.g., 72.8697 (Andheri)")
-
-# Advanced options
-with st.expander("⚙️ Advanced Pricing (optional)"):
-    col_a, col_b, col_c = st.columns(3)
-    with col_a:
-        base_fee = st.slider("Base Fee", 10, 100, 20, 5)
-    with col_b:
-        per_km = st.slider("₹/km Rate", 5, 30, 10, 1)
-    with col_c:
-        surge = st.slider("Surge Multiplier", 1.0, 2.5, 1.0, 0.1)
-    discount = st.slider("Discount (%)", 0, 50, 0, 5)
+    with col2:
+        st.write("**Drop-off Location**")
+        drop_lat = st.number_input("Drop Latitude", value=19.1136, format="%.4f", help="e.g., 19.1136 (Andheri)")
+        drop_lon = st.number_input("Drop Longitude", value=72.8697, format="%.4f", help="e.g., 72.8697 (Andheri)")
+
+    # Advanced options
+    with st.expander("⚙️ Advanced Pricing (optional)"):
+        col_a, col_b, col_c = st.columns(3)
+        with col_a:
+            base_fee = st.slider("Base Fee", 10, 100, 20, 5)
+        with col_b:
+            per_km = st.slider("₹/km Rate", 5, 30, 10, 1)
+        with col_c:
+            surge = st.slider("Surge Multiplier", 1.0, 2.5, 1.0, 0.1)
+        discount = st.slider("Discount (%)", 0, 50, 0, 5)
+
+    submitted = st.form_submit_button("Calculate", use_container_width=True)
 
 st.markdown('</div>', unsafe_allow_html=True)
 
-# Compute
-distance = haversine_distance(pickup_lat, pickup_lon, drop_lat, drop_lon)
-cost_breakdown = calculate_delivery_cost(
-    distance_km=distance,
-    base_fee=base_fee,
-    per_km_rate=per_km,
-    surge_multiplier=surge,
-    discount_percent=discount
-)
+# Compute (only on submit; other reruns reuse the last estimate)
+if submitted or "last_result" not in st.session_state:
+    distance = fast_distance_km(pickup_lat, pickup_lon, drop_lat, drop_lon)
+    st.session_state.last_result = {
+        "distance": distance,
+        "cost_breakdown": calculate_delivery_cost(
+            distance_km=distance,
+            base_fee=base_fee,
+            per_km_rate=per_km,
+            surge_multiplier=surge,
+            discount_percent=discount
+        )
+    }
 
-with st.spinner("Calculating fastest route... 🚀"):
-    time.sleep(0.4)
+distance = st.session_state.last_result["distance"]
+cost_breakdown = st.session_state.last_result["cost_breakdown"]
+surge = cost_breakdown["surge_multiplier"]
+discount = cost_breakdown["discount_percent"]
 
 # Results
 st.markdown('<div class="card">', unsafe_allow_html=True)
@@ -175,67 +217,100 @@ col4.markdown(f'<div class="metric-card"><div class="metric-value">-{discount}%<
 st.markdown(f"""
 <div style="text-align:center; margin: 1.5rem 0;">
     <h2 style="color:#2E7D32">✅ Total: 
-        <span style="color:#FF6B35; font-size:2.2rem">₨{cost_breakdown['final_total']}</span>
+        <span style="color:#FF6B35; font-size:2.2rem">₨{cost_breakdown['final_total']:.2f}</span>
     </h2>
     <p style="color:#666">Estimated delivery time: <b>{max(15, int(distance * 3))} mins</b></p>
 </div>
 """, unsafe_allow_html=True)
 
 # Waterfall chart
-fig = go.Figure(go.Waterfall(
-    orientation="v",
-    measure=["absolute", "relative", "relative", "relative", "total"],
-    x=["Base Fee", "Distance", "Surge", "Discount", "Final Total"],
-    text=[
-        f"₨{cost_breakdown['base_fee']}",
-        f"₨{cost_breakdown['distance_cost']}",
-        f"+₨{cost_breakdown['surge_amount']}",
-        f"-₨{cost_breakdown['discount_amount']}",
-        f"₨{cost_breakdown['final_total']}"
-    ],
-    y=[
-        cost_breakdown["base_fee"],
-        cost_breakdown["distance_cost"],
-        cost_breakdown["surge_amount"],
-        -cost_breakdown["discount_amount"],
-        cost_breakdown["final_total"]
-    ],
-    connector={"line": {"color": "rgb(63, 63, 63)"}},
-    decreasing={"marker": {"color": "#E53935"}},
-    increasing={"marker": {"color": "#1E88E5"}},
-    totals={"marker": {"color": "#43A047"}}
-))
-
-fig.update_layout(
-    title="💰 Cost Breakdown",
-    showlegend=False,
-    height=350,
-    margin=dict(t=40, b=40)
+fig = build_waterfall(
+    cost_breakdown["base_fee"],
+    cost_breakdown["distance_cost"],
+    cost_breakdown["surge_amount"],
+    cost_breakdown["discount_amount"],
+    cost_breakdown["final_total"]
 )
-st.plotly_chart(fig, use_container_width=True)
+st.plotly_chart(fig, use_container_width=True, config={"staticPlot": True, "displayModeBar": False})
 st.markdown('</div>', unsafe_allow_html=True)
 
 # Export button
-df = pd.DataFrame([{
-    "Distance (km)": distance,
-    "Base Fee (₨)": cost_breakdown["base_fee"],
-    "Distance Cost (₨)": cost_breakdown["distance_cost"],
-    "Surge Amount (₨)": cost_breakdown["surge_amount"],
-    "Discount (₨)": cost_breakdown["discount_amount"],
-    "Total (₨)": cost_breakdown["final_total"],
-    "Surge Multiplier": surge,
-    "Discount (%)": discount
-}])
-
-csv = df.to_csv(index=False).encode('utf-8')
+csv_bytes = make_csv_bytes(
+    distance,
+    cost_breakdown["base_fee"],
+    cost_breakdown["distance_cost"],
+    cost_breakdown["surge_amount"],
+    cost_breakdown["discount_amount"],
+    cost_breakdown["final_total"],
+    surge,
+    discount
+)
 st.download_button(
     "📥 Download Estimate (CSV)",
-    csv,
+    csv_bytes,
     "sasta_rapido_estimate.csv",
     "text/csv",
     use_container_width=True
 )
 
+# Batch estimate
+BATCH_COLUMNS = ["pickup_lat", "pickup_lon", "drop_lat", "drop_lon"]
+
+with st.expander("📦 Batch Estimate (upload CSV)"):
+    st.caption(f"CSV columns: {', '.join(BATCH_COLUMNS)}")
+    batch_file = st.file_uploader("Deliveries CSV", type="csv", key="batch_csv")
+    batch_df = _read_upload(batch_file) if batch_file is not None else None
+    if batch_df is not None:
+        missing = [c for c in BATCH_COLUMNS if c not in batch_df.columns]
+        if missing:
+            st.error(f"Missing columns: {', '.join(missing)}")
+        else:
+            batch_df, dropped = _coerce_coordinates(batch_df, BATCH_COLUMNS)
+            if dropped:
+                st.warning(f"Skipped {dropped} row(s) with missing or non-numeric coordinates.")
+            if batch_df.empty:
+                st.error("No rows with valid coordinates.")
+            else:
+                batch_df["distance_km"] = geoutils.haversine_vector(
+                    *(batch_df[c].to_numpy(dtype=float) for c in BATCH_COLUMNS)
+                )
+                batch_df["eta_mins"] = np.maximum(15, (batch_df["distance_km"] * 3).astype(int))
+                st.dataframe(batch_df, use_container_width=True)
+
+# Stop list
+STOP_COLUMNS = ["name", "lat", "lon"]
+
+with st.expander("🗺️ Upload list of stops"):
+    st.caption(f"CSV columns: {', '.join(STOP_COLUMNS)}")
+    stops_file = st.file_uploader("Stops CSV", type="csv", key="stops_csv")
+    stops_df = _read_upload(stops_file) if stops_file is not None else None
+    if stops_df is not None:
+        missing = [c for c in STOP_COLUMNS if c not in stops_df.columns]
+        if missing:
+            st.error(f"Missing columns: {', '.join(missing)}")
+        else:
+            stops_df, dropped = _coerce_coordinates(stops_df, ["lat", "lon"])
+            if dropped:
+                st.warning(f"Skipped {dropped} stop(s) with missing or non-numeric coordinates.")
+            if stops_df.empty:
+                st.error("No stops with valid coordinates.")
+            else:
+                stop_lat = stops_df["lat"].to_numpy(dtype=float)
+                stop_lon = stops_df["lon"].to_numpy(dtype=float)
+                from_pickup = geoutils.pairwise_haversine(
+                    np.array([pickup_lat]), np.array([pickup_lon]), stop_lat, stop_lon
+                )[0]
+                nearest = int(np.argmin(from_pickup))
+                st.success(
+                    f"Nearest stop to pickup: **{stops_df['name'].iloc[nearest]}** "
+                    f"({from_pickup[nearest]:.2f} km)"
+                )
+                matrix = geoutils.pairwise_haversine(stop_lat, stop_lon, stop_lat, stop_lon)
+                st.dataframe(
+                    pd.DataFrame(matrix, index=stops_df["name"], columns=stops_df["name"]).round(2),
+                    use_container_width=True
+                )
+
 # Footer
 st.markdown("""
 <footer>
@@ -0,0 +1 @@
+"""Numeric helpers for Sasta Rapido: numba-compiled distance and pricing kernels."""
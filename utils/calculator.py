@@ -0,0 +1,39 @@
+# utils/calculator.py — delivery pricing
+from numba import njit
+
+# Same fast-math set as utils/geoutils.py (no nnan/ninf); max(discounted,
+# min_total) returns a NaN first operand, so a NaN distance gives a NaN total.
+# Kept per file because numba's cache index only tracks the kernel's own file.
+_FASTMATH = {"nsz", "arcp", "contract", "afn", "reassoc"}
+
+@njit("UniTuple(f8,5)(f8,f8,f8,f8,f8,f8)", cache=True, fastmath=_FASTMATH)
+def _cost_kernel(distance_km, base_fee, per_km_rate, surge_multiplier, discount_percent, min_total):
+    """Compiled pricing arithmetic; returns the unrounded cost components."""
+    distance_cost = distance_km * per_km_rate
+    subtotal = base_fee + distance_cost
+    surcharged = subtotal * surge_multiplier
+    discounted = surcharged * (1.0 - discount_percent / 100.0)
+    total = max(discounted, min_total)
+    return distance_cost, subtotal, surcharged - subtotal, surcharged - discounted, total
+
+def calculate_delivery_cost(
+    distance_km,
+    base_fee=20,
+    per_km_rate=10,
+    surge_multiplier=1.0,
+    discount_percent=0,
+    min_total=30
+):
+    distance_cost, subtotal, surge_amount, discount_amount, total = _cost_kernel(
+        distance_km, base_fee, per_km_rate, surge_multiplier, discount_percent, min_total
+    )
+    return {
+        "base_fee": base_fee,
+        "distance_cost": distance_cost,
+        "subtotal": subtotal,
+        "surge_multiplier": surge_multiplier,
+        "surge_amount": surge_amount,
+        "discount_percent": discount_percent,
+        "discount_amount": discount_amount,
+        "final_total": total
+    }
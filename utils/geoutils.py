@@ -0,0 +1,62 @@
+# utils/geoutils.py — great circle distances (scalar kernels and array versions)
+import math
+
+import numpy as np
+from numba import njit
+from sklearn.metrics.pairwise import haversine_distances
+
+# LLVM fast-math flags: everything in fastmath=True except nnan/ninf, so NaN
+# coordinates stay NaN. The asin clamp is min(a, 1.0), which returns a NaN
+# first operand unchanged. Defined here (not shared) because numba's cache
+# index only tracks this file; editing the set must invalidate these kernels.
+_FASTMATH = {"nsz", "arcp", "contract", "afn", "reassoc"}
+
+R = 6371.0
+_DEG2RAD = 0.017453292519943295  # math.pi / 180.0
+
+# |dlat| + |dlon| below this (degrees, ~55 km) uses the equirectangular path.
+FAST_DISTANCE_MAX_DEG = 0.5
+
+@njit("f8(f8,f8,f8,f8)", cache=True, fastmath=_FASTMATH)
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """Calculate great circle distance in km."""
+    # NOTE: scalar path must use math.* not numpy.* — per-call ufunc
+    # dispatch dominates single-element work, and numba maps math.* to libm.
+    lat1 *= _DEG2RAD
+    lon1 *= _DEG2RAD
+    lat2 *= _DEG2RAD
+    lon2 *= _DEG2RAD
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
+    c = 2.0 * math.asin(math.sqrt(min(a, 1.0)))
+    return R * c
+
+@njit("f8(f8,f8,f8,f8)", cache=True, fastmath=_FASTMATH)
+def _equirectangular_distance(lat1, lon1, lat2, lon2):
+    """Equirectangular distance in km; <0.5% error for intra-city hops."""
+    x = (lon2 - lon1) * math.cos((lat1 + lat2) * 0.5 * _DEG2RAD)
+    y = lat2 - lat1
+    return R * _DEG2RAD * math.hypot(x, y)
+
+@njit("f8(f8,f8,f8,f8)", cache=True, fastmath=_FASTMATH)
+def fast_distance_km(lat1, lon1, lat2, lon2):
+    """Distance in km, approximated for short hops, haversine otherwise."""
+    if abs(lat2 - lat1) + abs(lon2 - lon1) < FAST_DISTANCE_MAX_DEG:
+        return _equirectangular_distance(lat1, lon1, lat2, lon2)
+    return haversine_distance(lat1, lon1, lat2, lon2)
+
+def haversine_vector(lat1, lon1, lat2, lon2):
+    """Great circle distance in km between arrays of points (broadcasts)."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
+    c = 2.0 * np.arcsin(np.sqrt(np.minimum(1.0, a)))
+    return R * c
+
+def pairwise_haversine(lat1, lon1, lat2, lon2):
+    """N×M matrix of great circle distances in km between two point lists."""
+    points1 = np.radians(np.stack([lat1, lon1], axis=1))
+    points2 = np.radians(np.stack([lat2, lon2], axis=1))
+    return R * haversine_distances(points1, points2)